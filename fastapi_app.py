@@ -1,8 +1,10 @@
 import os
+import re
 import uuid
 import time
 import asyncio
-from typing import Dict, List, Optional, Set
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
 from fastapi import FastAPI, UploadFile, File, Form, WebSocket, WebSocketDisconnect
 from fastapi.responses import FileResponse, JSONResponse
 from fastapi.staticfiles import StaticFiles
@@ -10,12 +12,40 @@ from starlette.middleware.cors import CORSMiddleware
 from translator import EnhancedTranslator
 from dotenv import load_dotenv
 import json
-import http.client
+import httpx
 import tempfile
 import shutil
 import hashlib
 import logging
 from logging.handlers import TimedRotatingFileHandler
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+load_dotenv()
+
+# Jobs live in this process only; with several workers, each gets a distinct WORKER_ID and the
+# job_id prefix lets a router (or get_job) tell which worker owns a job
+WORKER_ID = int(os.environ.get("WORKER_ID", "0"))
+BROADCAST_BATCH = 50
+UPLOAD_CHUNK_SIZE = 1 << 20
+PROGRESS_MIN_INTERVAL = 0.1
+PROGRESS_MIN_DELTA = 0.5
+DOCX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+# Retain terms may be separated by commas and/or newlines
+_TERM_SPLIT = re.compile(r"[,\n\r]+")
+FINISHED_STATUSES = ("completed", "error", "cancelled")
+# Cheap shape check so obviously malformed keys never reach the network
+_KEY_RE = re.compile(r"^sk-[A-Za-z0-9_\-]{20,}$")
+
+def _dumps(payload: dict) -> str:
+    # One serialization per broadcast, shared by every socket
+    if orjson is not None:
+        return orjson.dumps(payload).decode()
+    return json.dumps(payload, separators=(",", ":"))
+
+_NOT_FOUND_TEXT = _dumps({"error": "Not found"})
 
 class Job:
     def __init__(self, job_id: str, input_path: str, output_path: str, target_language: str, retain_terms: List[str]):
@@ -24,6 +54,8 @@ class Job:
         self.output_path = output_path
         self.target_language = target_language
         self.retain_terms = retain_terms
+        self.filename = os.path.basename(input_path)
+        self.job_dir_abs = os.path.abspath(os.path.dirname(input_path))
         self.status = "pending"
         self.progress = 0.0
         self.avg_quality = 0.0
@@ -31,62 +63,184 @@ class Job:
         self.started_at: Optional[float] = None
         self.completed_at: Optional[float] = None
         self.error: Optional[str] = None
-        self.clients: Set[WebSocket] = set()
+        self.clients: Dict[int, WebSocket] = {}
         self.task: Optional[asyncio.Task] = None
         self.temp_dir: Optional[str] = None
 
+def _save_upload(src, dest_path: str):
+    with open(dest_path, "wb") as f:
+        shutil.copyfileobj(src, f, UPLOAD_CHUNK_SIZE)
+
 class JobManager:
-    def __init__(self):
+    def __init__(self, worker_id: int = 0):
         self.jobs: Dict[str, Job] = {}
-        self.lock = asyncio.Lock()
+        self.job_prefix = f"{worker_id}-"
 
-    async def create_job(self, input_dir: str, filename: str, data: bytes, target_language: str, retain_terms_raw: Optional[str]) -> Job:
-        job_id = str(uuid.uuid4())
+    async def create_job(self, input_dir: str, upload: UploadFile, target_language: str, retain_terms_raw: Optional[str]) -> Job:
+        job_id = f"{self.job_prefix}{uuid.uuid4().hex}"
         job_dir = os.path.join(input_dir, job_id)
         os.makedirs(job_dir, exist_ok=True)
+        filename = upload.filename
         input_path = os.path.join(job_dir, filename)
-        with open(input_path, "wb") as f:
-            f.write(data)
+        # Stream the spooled upload to disk in a worker thread instead of buffering it in memory
+        await asyncio.to_thread(_save_upload, upload.file, input_path)
         base, ext = os.path.splitext(filename)
         output_path = os.path.join(job_dir, f"{base}_{target_language}_enhanced{ext}")
-        retain_terms = []
-        if retain_terms_raw:
-            parts = [p.strip() for p in retain_terms_raw.replace("\r", "").split("\n")]
-            flat = [s.strip() for p in parts for s in (p.split(",") if "," in p else [p])]
-            retain_terms = [t for t in flat if t]
+        retain_terms = [t for t in (s.strip() for s in _TERM_SPLIT.split(retain_terms_raw)) if t] if retain_terms_raw else []
         job = Job(job_id, input_path, output_path, target_language, retain_terms)
-        async with self.lock:
-            self.jobs[job_id] = job
+        # Single event loop and no await between lookup and mutation, so plain dict access is safe
+        self.jobs[job_id] = job
         return job
 
-    async def get_job(self, job_id: str) -> Optional[Job]:
-        async with self.lock:
-            return self.jobs.get(job_id)
+    def get_job(self, job_id: str) -> Optional[Job]:
+        # Jobs owned by another worker can never be here
+        if not job_id.startswith(self.job_prefix):
+            return None
+        return self.jobs.get(job_id)
 
-    async def add_client(self, job_id: str, ws: WebSocket):
-        job = await self.get_job(job_id)
-        if job is not None:
-            job.clients.add(ws)
+    def add_client(self, job: Job, ws: WebSocket):
+        job.clients[id(ws)] = ws
 
-    async def remove_client(self, job_id: str, ws: WebSocket):
-        job = await self.get_job(job_id)
-        if job is not None and ws in job.clients:
-            job.clients.remove(ws)
+    def remove_client(self, job: Job, ws: WebSocket):
+        job.clients.pop(id(ws), None)
 
-    async def broadcast(self, job: Job, payload: dict):
+    async def _send_all(self, clients: Tuple[WebSocket, ...], text: str) -> List[WebSocket]:
+        # Send concurrently so a slow socket can't stall the rest; large fan-outs go in
+        # batches with a yield in between to keep the event loop responsive
         stale: List[WebSocket] = []
-        for ws in list(job.clients):
+        for i in range(0, len(clients), BROADCAST_BATCH):
+            batch = clients[i:i + BROADCAST_BATCH]
+            results = await asyncio.gather(*(ws.send_text(text) for ws in batch), return_exceptions=True)
+            stale.extend(ws for ws, res in zip(batch, results) if isinstance(res, Exception))
+            if i + BROADCAST_BATCH < len(clients):
+                await asyncio.sleep(0)
+        return stale
+
+    async def broadcast(self, job: Job, payload: dict):
+        if not job.clients:
+            return
+        stale = await self._send_all(tuple(job.clients.values()), _dumps(payload))
+        for ws in stale:
+            self.remove_client(job, ws)
+
+# Interpret common statuses conservatively; 429 means the key is valid but rate limited,
+# anything unlisted is treated as temporary/unreachable
+_PROBE_OK = {"ok": True, "reason": "ok"}
+_PROBE_INVALID = {"ok": False, "reason": "invalid"}
+_PROBE_UNREACHABLE = {"ok": False, "reason": "unreachable"}
+_PROBE_RESULTS = {200: _PROBE_OK, 429: _PROBE_OK, 401: _PROBE_INVALID, 403: _PROBE_INVALID}
+
+async def _probe_openai(client: httpx.AsyncClient, key: str) -> dict:
+    try:
+        # Use a lightweight endpoint that verifies key validity without billing-specific scopes.
+        # Only the status matters, so the response body is never downloaded.
+        async with client.stream("GET", "/v1/models", headers={"Authorization": f"Bearer {key}"}) as r:
+            status = r.status_code
+    except Exception:
+        return _PROBE_UNREACHABLE
+    return _PROBE_RESULTS.get(status, _PROBE_UNREACHABLE)
+
+class ProbeCache:
+    def __init__(self, ok_ttl: float = 300, fail_ttl: float = 15, max_fail_ttl: float = 120, maxsize: int = 1024):
+        self.ok_ttl = ok_ttl
+        self.fail_ttl = fail_ttl
+        self.max_fail_ttl = max_fail_ttl
+        self.maxsize = maxsize
+        # In-process LRU keyed by the raw key; entries are (monotonic ts, result, consecutive failures)
+        self.entries: "OrderedDict[str, Tuple[float, dict, int]]" = OrderedDict()
+        self.locks: Dict[str, asyncio.Lock] = {}
+
+    def _fresh(self, key: str, now_ts: float) -> Optional[dict]:
+        cached = self.entries.get(key)
+        if not cached:
+            return None
+        last_ts, last_res, fails = cached
+        # Back off exponentially on consecutive failures so outages don't trigger a probe per request
+        ttl = self.ok_ttl if last_res.get("ok") else min(self.max_fail_ttl, self.fail_ttl * 2 ** (fails - 1))
+        return last_res if (now_ts - last_ts) < ttl else None
+
+    def _store(self, key: str, res: dict):
+        prev = self.entries.get(key)
+        fails = 0 if res.get("ok") else (prev[2] if prev else 0) + 1
+        self.entries[key] = (time.monotonic(), res, fails)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            old_key, _ = self.entries.popitem(last=False)
+            lock = self.locks.get(old_key)
+            if lock is not None and not lock.locked():
+                del self.locks[old_key]
+
+    async def get_or_compute(self, key: str, compute: Callable[..., Awaitable[dict]], *args) -> dict:
+        res = self._fresh(key, time.monotonic())
+        if res is not None:
+            self.entries.move_to_end(key)
+            return res
+        # One upstream probe per key at a time; concurrent callers reuse its result
+        lock = self.locks.get(key)
+        if lock is None:
+            lock = self.locks[key] = asyncio.Lock()
+        async with lock:
+            res = self._fresh(key, time.monotonic())
+            if res is None:
+                res = await compute(*args)
+                self._store(key, res)
+            return res
+
+class TranslatorPool:
+    def __init__(self, maxsize: int = 64):
+        self.maxsize = maxsize
+        # Reuse one translator (and its OpenAI connection pool) per API key across jobs
+        self.translators: "OrderedDict[str, EnhancedTranslator]" = OrderedDict()
+        self.in_use: Dict[str, int] = {}
+
+    async def acquire(self, api_key: str) -> Tuple[str, EnhancedTranslator]:
+        key_hash = hashlib.blake2b(api_key.encode("utf-8"), digest_size=16).hexdigest()
+        translator = self.translators.get(key_hash)
+        if translator is None:
+            translator = self.translators[key_hash] = EnhancedTranslator(api_key)
+        self.translators.move_to_end(key_hash)
+        self.in_use[key_hash] = self.in_use.get(key_hash, 0) + 1
+        await self._evict()
+        return key_hash, translator
+
+    async def release(self, key_hash: str):
+        count = self.in_use.get(key_hash, 0) - 1
+        if count > 0:
+            self.in_use[key_hash] = count
+        else:
+            self.in_use.pop(key_hash, None)
+        await self._evict()
+
+    async def _evict(self):
+        # Least recently used first; translators still serving a job are never closed.
+        # Another acquire/release may evict the same key while we await aclose(), so pop defensively.
+        for key_hash in list(self.translators):
+            if len(self.translators) <= self.maxsize:
+                break
+            if key_hash in self.in_use:
+                continue
+            translator = self.translators.pop(key_hash, None)
+            if translator is None:
+                continue
             try:
-                await ws.send_json(payload)
+                await translator.aclose()
             except Exception:
-                stale.append(ws)
-        for ws in stale:
-            await self.remove_client(job.job_id, ws)
+                pass
 
-job_manager = JobManager()
+    async def close(self):
+        translators = list(self.translators.values())
+        self.translators.clear()
+        for translator in translators:
+            try:
+                await translator.aclose()
+            except Exception:
+                pass
+
+job_manager = JobManager(WORKER_ID)
+probe_cache = ProbeCache()
+translator_pool = TranslatorPool()
 
 app = FastAPI()
-load_dotenv()
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -96,9 +250,10 @@ app.add_middleware(
 )
 
 PROJECT_ROOT = os.path.dirname(__file__)
-static_dir = os.path.join(PROJECT_ROOT, "web")
-os.makedirs(static_dir, exist_ok=True)
-app.mount("/static", StaticFiles(directory=static_dir), name="static")
+STATIC_DIR = os.path.join(PROJECT_ROOT, "web")
+os.makedirs(STATIC_DIR, exist_ok=True)
+INDEX_HTML_PATH = os.path.join(STATIC_DIR, "index.html")
+app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
 
 # Data and logs directories
 DATA_ROOT = os.path.join(PROJECT_ROOT, "data")
@@ -109,7 +264,8 @@ os.makedirs(LOGS_ROOT, exist_ok=True)
 def setup_logging():
     try:
         handler = TimedRotatingFileHandler(os.path.join(LOGS_ROOT, "app.log"), when="midnight", utc=True, backupCount=7)
-        formatter = logging.Formatter('%(asctime)sZ %(message)s')
+        # ISO-8601 UTC timestamps come from the formatter, so log call sites don't stamp their own
+        formatter = logging.Formatter('%(asctime)sZ %(message)s', datefmt='%Y-%m-%dT%H:%M:%S')
         # Use UTC for timestamps
         logging.Formatter.converter = time.gmtime
         handler.setFormatter(formatter)
@@ -122,6 +278,15 @@ def setup_logging():
     except Exception:
         pass
 
+# Server-side health is client-key only and never changes, so the frame is encoded once at import
+_HEALTH_TEXT = _dumps({
+    "type": "health",
+    "api_key_present": False,
+    "openai_reachable": False,
+    "age_seconds": 0.0,
+    "reason": "client_key_only"
+})
+
 class DataCleaner:
     def __init__(self, root_dir: str, ttl_seconds: float = 12*3600, interval_seconds: float = 1800):
         self.root_dir = root_dir
@@ -134,68 +299,78 @@ class DataCleaner:
             self._task = asyncio.create_task(self._run())
 
     async def _run(self):
+        # Wait one interval before the first sweep so startup isn't competing with cleanup
         while True:
+            await asyncio.sleep(self.interval_seconds)
             try:
                 await self._clean_once()
             except Exception:
                 pass
-            await asyncio.sleep(self.interval_seconds)
+
+    async def _prune_jobs(self, now_ts: float):
+        # Forget finished jobs past the TTL so job_manager.jobs doesn't grow without bound
+        for job in list(job_manager.jobs.values()):
+            if job.status not in FINISHED_STATUSES:
+                continue
+            if now_ts - (job.completed_at or job.created_at) < self.ttl_seconds:
+                continue
+            job_manager.jobs.pop(job.job_id, None)
+            if job.temp_dir:
+                await asyncio.to_thread(shutil.rmtree, job.temp_dir, ignore_errors=True)
+                job.temp_dir = None
 
     async def _clean_once(self):
         try:
             now_ts = time.time()
-            if not os.path.isdir(self.root_dir):
-                return
-            for name in os.listdir(self.root_dir):
-                path = os.path.join(self.root_dir, name)
+            await self._prune_jobs(now_ts)
+            # Snapshot running job dirs on the loop; the filesystem walk runs in a worker thread
+            active_dirs = {j.job_dir_abs for j in job_manager.jobs.values() if j.status == "running"}
+            await asyncio.to_thread(self._clean_once_sync, now_ts, active_dirs)
+        except Exception:
+            return
+
+    def _clean_once_sync(self, now_ts: float, active_dirs: Set[str]):
+        if not os.path.isdir(self.root_dir):
+            return
+        with os.scandir(self.root_dir) as it:
+            for entry in it:
+                name, path = entry.name, entry.path
                 try:
-                    if not os.path.isdir(path):
+                    if not entry.is_dir():
                         continue
                     # Skip active jobs
-                    active = False
-                    try:
-                        for job in list(job_manager.jobs.values()):
-                            jd = os.path.dirname(job.input_path)
-                            if os.path.abspath(jd) == os.path.abspath(path) and job.status == "running":
-                                active = True
-                                break
-                    except Exception:
-                        active = False
-                    if active:
+                    if os.path.abspath(path) in active_dirs:
                         continue
                     # Age threshold based on last modification time
-                    age = now_ts - float(os.path.getmtime(path))
+                    age = now_ts - float(entry.stat().st_mtime)
                     if age >= self.ttl_seconds:
                         try:
                             shutil.rmtree(path, ignore_errors=True)
-                            logging.info(f"CLEAN status=deleted dir={name} age_seconds={int(age)} at={time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())}")
+                            logging.info("CLEAN status=deleted dir=%s age_seconds=%d", name, int(age))
                         except Exception as e:
-                            logging.info(f"CLEAN status=error dir={name} at={time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())} error={str(e)}")
+                            logging.info("CLEAN status=error dir=%s error=%s", name, e)
                 except Exception:
                     continue
-        except Exception:
-            return
 
 @app.post("/api/translate")
 async def start_translation(file: UploadFile = File(...), target_language: str = Form(...), retain_terms: Optional[str] = Form(None), api_key: Optional[str] = Form(None)):
     effective_api_key = (api_key or "").strip()
     if not effective_api_key:
         return JSONResponse({"error": "API key is missing"}, status_code=400)
+    if not _KEY_RE.match(effective_api_key):
+        return JSONResponse({"error": "API key is invalid"}, status_code=400)
     if not file.filename.lower().endswith(".docx"):
         return JSONResponse({"error": "Only .docx files are supported"}, status_code=400)
-    data_root = os.path.join(DATA_ROOT, str(uuid.uuid4()))
-    os.makedirs(data_root, exist_ok=True)
-    file_bytes = await file.read()
-    job = await job_manager.create_job(data_root, file.filename, file_bytes, target_language, retain_terms)
+    job = await job_manager.create_job(DATA_ROOT, file, target_language, retain_terms)
     job.temp_dir = os.path.dirname(job.input_path)
-    logging.info(f"JOB status=created id={job.job_id} file={os.path.basename(job.input_path)} at={time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())}")
+    logging.info("JOB status=created id=%s file=%s", job.job_id, job.filename)
     task = asyncio.create_task(run_job(job.job_id, effective_api_key))
     job.task = task
     return {"job_id": job.job_id}
 
 @app.get("/api/status/{job_id}")
 async def get_status(job_id: str):
-    job = await job_manager.get_job(job_id)
+    job = job_manager.get_job(job_id)
     if job is None:
         return JSONResponse({"error": "Not found"}, status_code=404)
     elapsed = 0.0
@@ -213,34 +388,42 @@ async def get_status(job_id: str):
 @app.websocket("/ws/progress/{job_id}")
 async def progress_ws(websocket: WebSocket, job_id: str):
     await websocket.accept()
-    job = await job_manager.get_job(job_id)
+    job = job_manager.get_job(job_id)
     if job is None:
-        await websocket.send_json({"error": "Not found"})
+        await websocket.send_text(_NOT_FOUND_TEXT)
         await websocket.close()
         return
-    await job_manager.add_client(job_id, websocket)
+    job_manager.add_client(job, websocket)
     try:
-        while True:
-            await websocket.receive_text()
-    except WebSocketDisconnect:
-        await job_manager.remove_client(job_id, websocket)
+        # Progress is push-only; drain raw frames until the peer disconnects
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        job_manager.remove_client(job, websocket)
 
 @app.get("/api/download/{job_id}")
 async def download(job_id: str):
-    job = await job_manager.get_job(job_id)
+    job = job_manager.get_job(job_id)
     if job is None:
         return JSONResponse({"error": "Not found"}, status_code=404)
-    if job.status != "completed" or not os.path.exists(job.output_path):
+    if job.status != "completed":
+        return JSONResponse({"error": "Not ready"}, status_code=400)
+    try:
+        # Single stat reused by FileResponse for Content-Length/ETag instead of a second lookup
+        stat_result = os.stat(job.output_path)
+    except OSError:
         return JSONResponse({"error": "Not ready"}, status_code=400)
     filename = os.path.basename(job.output_path)
-    return FileResponse(job.output_path, filename=filename, media_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document")
+    return FileResponse(job.output_path, filename=filename, media_type=DOCX_MEDIA_TYPE, stat_result=stat_result)
 
 @app.post("/api/cancel/{job_id}")
 async def cancel(job_id: str):
-    job = await job_manager.get_job(job_id)
+    job = job_manager.get_job(job_id)
     if job is None:
         return JSONResponse({"error": "Not found"}, status_code=404)
-    if job.status in ("completed", "error", "cancelled"):
+    if job.status in FINISHED_STATUSES:
         return {"ok": True, "status": job.status}
     job.status = "cancelled"
     job.completed_at = time.time()
@@ -254,129 +437,105 @@ async def cancel(job_id: str):
     except Exception:
         pass
     try:
-        if job.temp_dir and os.path.isdir(job.temp_dir):
-            shutil.rmtree(job.temp_dir, ignore_errors=True)
-            job.temp_dir = None
+        if job.temp_dir:
+            temp_dir, job.temp_dir = job.temp_dir, None
+            await asyncio.to_thread(shutil.rmtree, temp_dir, ignore_errors=True)
     except Exception:
         pass
-    logging.info(f"JOB status=cancelled id={job.job_id} file={os.path.basename(job.input_path)} at={time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())}")
+    logging.info("JOB status=cancelled id=%s file=%s", job.job_id, job.filename)
     return {"ok": True, "status": "cancelled"}
 
 async def run_job(job_id: str, effective_api_key: Optional[str] = None):
-    job = await job_manager.get_job(job_id)
+    job = job_manager.get_job(job_id)
     if job is None:
         return
     job.status = "running"
     job.started_at = time.time()
-    api_key = effective_api_key
-    translator = EnhancedTranslator(api_key)
+    key_hash, translator = await translator_pool.acquire(effective_api_key)
     try:
-        async for progress, avg_quality in translator.process_enhanced_translation(job.input_path, job.output_path, job.target_language, job.retain_terms):
+        # Coalesce progress frames by time and progress delta; the 100% frame always goes out
+        loop = asyncio.get_running_loop()
+        last_sent, last_ts = 0.0, 0.0
+        # Write to a sibling temp file and rename once done so downloads never see a partial document
+        tmp_output_path = job.output_path + ".tmp"
+        async for progress, avg_quality in translator.process_enhanced_translation(job.input_path, tmp_output_path, job.target_language, job.retain_terms):
             job.progress = float(progress)
             job.avg_quality = float(avg_quality)
+            # Poll-only jobs (no WebSocket subscribers) skip building the frame entirely
+            if not job.clients:
+                continue
+            now_mono = loop.time()
+            if job.progress < 100.0 and job.progress - last_sent < PROGRESS_MIN_DELTA and now_mono - last_ts < PROGRESS_MIN_INTERVAL:
+                continue
+            last_sent, last_ts = job.progress, now_mono
             elapsed = max(0.0, time.time() - (job.started_at or time.time()))
             await job_manager.broadcast(job, {"type": "progress", "progress": round(job.progress, 2), "avg_quality": round(job.avg_quality, 2), "elapsed_seconds": round(elapsed, 1)})
+        os.replace(tmp_output_path, job.output_path)
         job.status = "completed"
         job.completed_at = time.time()
         elapsed = max(0.0, job.completed_at - (job.started_at or job.completed_at))
         await job_manager.broadcast(job, {"type": "completed", "progress": 100.0, "avg_quality": round(job.avg_quality, 2), "elapsed_seconds": round(elapsed, 1), "download_url": f"/api/download/{job.job_id}"})
-        logging.info(f"JOB status=completed id={job.job_id} file={os.path.basename(job.input_path)} at={time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())}")
+        logging.info("JOB status=completed id=%s file=%s", job.job_id, job.filename)
     except Exception as e:
         if isinstance(e, asyncio.CancelledError):
             job.status = "cancelled"
             job.error = None
-            logging.info(f"JOB status=cancelled id={job.job_id} file={os.path.basename(job.input_path)} at={time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())}")
+            logging.info("JOB status=cancelled id=%s file=%s", job.job_id, job.filename)
         else:
             job.status = "error"
             job.error = str(e)
+            job.completed_at = time.time()
             await job_manager.broadcast(job, {"type": "error", "message": job.error})
-            logging.info(f"JOB status=error id={job.job_id} file={os.path.basename(job.input_path)} at={time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())} error={job.error}")
+            logging.info("JOB status=error id=%s file=%s error=%s", job.job_id, job.filename, job.error)
         try:
-            if job.temp_dir and os.path.isdir(job.temp_dir):
-                shutil.rmtree(job.temp_dir, ignore_errors=True)
-                job.temp_dir = None
+            if job.temp_dir:
+                temp_dir, job.temp_dir = job.temp_dir, None
+                await asyncio.to_thread(shutil.rmtree, temp_dir, ignore_errors=True)
         except Exception:
             pass
-
-@app.get("/")
-async def root_index():
-    return FileResponse(os.path.join(static_dir, "index.html"))
+    finally:
+        await translator_pool.release(key_hash)
 
 @app.on_event("startup")
 async def on_start():
     setup_logging()
+    # Shared keep-alive client so key probes reuse one TLS connection
+    app.state.http = httpx.AsyncClient(base_url="https://api.openai.com", timeout=3.0, http2=True, limits=httpx.Limits(max_keepalive_connections=20))
     cleaner = DataCleaner(DATA_ROOT)
     await cleaner.start()
 
+@app.on_event("shutdown")
+async def on_stop():
+    http_client = getattr(app.state, "http", None)
+    if http_client is not None:
+        await http_client.aclose()
+    await translator_pool.close()
+
 @app.websocket("/ws/health")
 async def ws_health(websocket: WebSocket):
     await websocket.accept()
     try:
-        while True:
-            now = time.time()
-            payload = {
-                "type": "health",
-                "api_key_present": False,
-                "openai_reachable": False,
-                "checked_at": now,
-                "age_seconds": 0.0,
-                "reason": "client_key_only"
-            }
-            await websocket.send_json(payload)
-            await asyncio.sleep(5)
-    except WebSocketDisconnect:
-        return
+        await websocket.send_text(_HEALTH_TEXT)
+        # Health is sent once on connect; drain raw frames until the peer disconnects
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+    except (WebSocketDisconnect, RuntimeError):
+        pass
 
 @app.post("/api/validate_key")
 async def validate_key(api_key: Optional[str] = Form(None)):
     key = (api_key or "").strip()
     if not key:
         return JSONResponse({"ok": False, "reason": "missing"}, status_code=200)
-    # Simple in-memory cache to avoid hammering OpenAI on frequent validations
-    # Cache by hash for privacy
-    global _key_cache
-    try:
-        _key_cache
-    except NameError:
-        _key_cache = {}
-    now_ts = time.time()
-    key_hash = hashlib.sha256(key.encode("utf-8")).hexdigest()
-    cached = _key_cache.get(key_hash)
-    if cached:
-        last_ts, last_res = cached
-        # Minimum interval between upstream checks
-        if (now_ts - last_ts) < 15:
-            return {"ok": bool(last_res.get("ok")), "reason": last_res.get("reason") or ("ok" if last_res.get("ok") else "invalid")}
-        # Respect TTLs: 5 minutes for success, 30s for failure
-        if (last_res.get("ok") and (now_ts - last_ts) < 300) or ((not last_res.get("ok")) and (now_ts - last_ts) < 30):
-            return {"ok": bool(last_res.get("ok")), "reason": last_res.get("reason") or ("ok" if last_res.get("ok") else "invalid")}
+    if not _KEY_RE.match(key):
+        return {"ok": False, "reason": "invalid_format"}
     try:
-        def do_req():
-            try:
-                # Use a lightweight endpoint that verifies key validity without billing-specific scopes
-                conn = http.client.HTTPSConnection("api.openai.com", timeout=3)
-                conn.request("GET", "/v1/models", headers={"Authorization": f"Bearer {key}"})
-                r = conn.getresponse()
-                s = r.status
-                raw = r.read() or b""
-                conn.close()
-            except Exception:
-                return {"ok": False, "reason": "unreachable"}
-            # Interpret common statuses conservatively
-            if s == 200:
-                return {"ok": True, "reason": "ok"}
-            if s == 429:
-                # Key is valid but currently rate limited
-                return {"ok": True, "reason": "ok"}
-            if s in (401, 403):
-                return {"ok": False, "reason": "invalid"}
-            # Other statuses treated as temporary/unreachable
-            return {"ok": False, "reason": "unreachable"}
-        res = await asyncio.to_thread(do_req)
-        ok = bool(res.get("ok"))
-        reason = res.get("reason") or ("ok" if ok else "invalid")
-        # Update cache
-        _key_cache[key_hash] = (now_ts, {"ok": ok, "reason": reason})
-        return {"ok": ok, "reason": reason}
+        res = await probe_cache.get_or_compute(key, _probe_openai, app.state.http, key)
+        return {"ok": bool(res.get("ok")), "reason": res.get("reason") or ("ok" if res.get("ok") else "invalid")}
     except Exception:
         return JSONResponse({"ok": False, "reason": "unreachable"}, status_code=200)
+
+# A plain GET route rather than a "/" mount: mounts also match websocket scopes, which StaticFiles rejects
+@app.get("/")
+async def root_index():
+    return FileResponse(INDEX_HTML_PATH)
@@ -1,3 +1,6 @@
+from functools import lru_cache
+from typing import Tuple
+
 SYSTEM_PROMPT_BASE = """
 You are an expert translator creating educational content for students. Your task is to translate the given English text into a simple, clear, and natural-sounding version of {target_lang}. The final text will be read by students during an exam, so it MUST be easy to understand quickly.
 
@@ -36,6 +39,11 @@ Previous translation had quality issues. Focus on:
 - Preserving all formatting exactly
 """
 
+BATCH_INSTRUCTION = """
+## Multiple Segments:
+The input contains {count} separate segments separated by lines containing only %%. Translate each segment independently and return exactly {count} translated segments in the same order, separated by lines containing only %%. Do not merge, split, number or drop segments.
+"""
+
 QUALITY_ASSESSMENT_PROMPT = """
 You are a translation quality assessor. Rate this translation from English to {target_lang} (0-40 total):
 
@@ -49,4 +57,30 @@ Rate on:
 4. Educational Appropriateness (0-10): Is it suitable for students?
 
 Provide only the total score (0-40).
-"""
\ No newline at end of file
+"""
+
+@lru_cache(maxsize=256)
+def build_system_prompt(target_lang: str, user_terms: Tuple[str, ...], attempt: int, batch_count: int = 0) -> str:
+    prompt = SYSTEM_PROMPT_BASE.format(target_lang=target_lang)
+    if user_terms:
+        terms_list_str = ", ".join(f'"{term}"' for term in user_terms)
+        prompt += USER_TERMS_INSTRUCTION.format(terms_list_str=terms_list_str)
+    prompt += MASK_INSTRUCTION
+    if attempt > 0:
+        prompt += RETRY_PROMPT_ADDITION.format(attempt=attempt + 1)
+    if batch_count > 1:
+        prompt += BATCH_INSTRUCTION.format(count=batch_count)
+    return prompt
+
+
+@lru_cache(maxsize=64)
+def _quality_prompt_parts(target_lang: str) -> Tuple[str, str, str]:
+    # Split the raw template first; target_lang is user input and may itself contain "{original}"
+    head, rest = QUALITY_ASSESSMENT_PROMPT.split("{original}")
+    middle, tail = rest.split("{translated}")
+    return tuple(part.replace("{target_lang}", target_lang) for part in (head, middle, tail))
+
+
+def build_quality_prompt(target_lang: str, original: str, translated: str) -> str:
+    head, middle, tail = _quality_prompt_parts(target_lang)
+    return head + original + middle + translated + tail
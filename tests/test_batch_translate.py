@@ -0,0 +1,83 @@
+import asyncio
+import types
+
+import pytest
+
+pytest.importorskip("openai")
+pytest.importorskip("docx")
+pytest.importorskip("httpx")
+
+from translator import EnhancedTranslator
+
+
+class FakeStream:
+    def __init__(self, text, chunk_size=4):
+        self.pieces = [text[i:i + chunk_size] for i in range(0, len(text), chunk_size)]
+        self.consumed = 0
+        self.closed = False
+
+    async def __aiter__(self):
+        for piece in self.pieces:
+            self.consumed += 1
+            yield types.SimpleNamespace(choices=[types.SimpleNamespace(delta=types.SimpleNamespace(content=piece))])
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeCompletions:
+    def __init__(self, replies):
+        self.replies = list(replies)
+        self.streams = []
+
+    async def create(self, model, messages, stream=False, **kwargs):
+        reply = self.replies.pop(0)
+        if stream:
+            self.streams.append(FakeStream(reply))
+            return self.streams[-1]
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(message=types.SimpleNamespace(content=reply))])
+
+
+def make_translator(replies):
+    t = EnhancedTranslator("sk-test")
+    t._spacy_available = False
+    t.quality_sample_rate = 0
+    t.client = types.SimpleNamespace(chat=types.SimpleNamespace(completions=FakeCompletions(replies)))
+    return t
+
+
+def test_chunk_texts_respects_item_and_char_limits():
+    t = make_translator([])
+    t.batch_max_items, t.batch_max_chars = 2, 10
+    assert t._chunk_texts(["aaaa", "bbbb", "cccc", "dddddddddd", "e"]) == [["aaaa", "bbbb"], ["cccc"], ["dddddddddd"], ["e"]]
+
+
+def test_chunk_texts_isolates_segments_containing_separator():
+    t = make_translator([])
+    assert t._chunk_texts(["one", "a\n%%\nb", "two"]) == [["a\n%%\nb"], ["one", "two"]]
+
+
+def test_batch_reply_is_split_on_separator_lines_and_unmasked():
+    t = make_translator(["Bonjour <<UT0>>\n  %%  \nAu revoir"])
+    result = asyncio.run(t._batch_translate(["Hello Acme", "Goodbye"], "French", ["Acme"]))
+    assert [translated for translated, _ in result] == ["Bonjour Acme", "Au revoir"]
+
+
+@pytest.mark.parametrize("reply", ["Bonjour", "Bonjour\n%%\n   "])
+def test_batch_reply_with_wrong_or_empty_segments_is_rejected(reply):
+    t = make_translator([reply])
+    assert asyncio.run(t._batch_translate(["Hello", "Goodbye"], "French", [])) is None
+
+
+def test_stream_is_closed_early_when_reply_has_too_many_segments():
+    t = make_translator(["A\n%%\nB\n%%\nC\n%%\n" + "x" * 200])
+    assert asyncio.run(t._batch_translate(["Hello", "Goodbye"], "French", [])) is None
+    stream = t.client.chat.completions.streams[0]
+    assert stream.closed
+    assert stream.consumed < len(stream.pieces)
+
+
+def test_batch_mismatch_falls_back_to_per_segment_translation():
+    t = make_translator(["only one segment", "Bonjour", "Au revoir"])
+    results = asyncio.run(t.translate_batch_with_quality(["Hello", "Goodbye"], "French", []))
+    assert [(original, translated) for original, translated, _ in results] == [("Hello", "Bonjour"), ("Goodbye", "Au revoir")]
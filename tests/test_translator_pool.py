@@ -0,0 +1,60 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("openai")
+pytest.importorskip("docx")
+
+import fastapi_app
+from fastapi_app import TranslatorPool
+
+
+class StubTranslator:
+    def __init__(self, api_key):
+        self.api_key = api_key
+        self.closed = False
+
+    async def aclose(self):
+        # Yield like a real client close, so concurrent evictions interleave
+        await asyncio.sleep(0)
+        self.closed = True
+
+
+@pytest.fixture(autouse=True)
+def stub_translator(monkeypatch):
+    monkeypatch.setattr(fastapi_app, "EnhancedTranslator", StubTranslator)
+
+
+def test_same_key_shares_translator_and_refcount():
+    async def scenario():
+        pool = TranslatorPool()
+        key_hash, first = await pool.acquire("sk-a")
+        _, second = await pool.acquire("sk-a")
+        assert first is second and pool.in_use[key_hash] == 2
+        await pool.release(key_hash)
+        assert pool.in_use[key_hash] == 1
+        await pool.release(key_hash)
+        assert key_hash not in pool.in_use and key_hash in pool.translators
+    asyncio.run(scenario())
+
+
+def test_eviction_closes_idle_lru_and_keeps_busy_translators():
+    async def scenario():
+        pool = TranslatorPool(maxsize=1)
+        busy_hash, busy = await pool.acquire("sk-busy")
+        idle_hash, idle = await pool.acquire("sk-idle")
+        await pool.release(idle_hash)
+        assert idle.closed and idle_hash not in pool.translators
+        assert not busy.closed and busy_hash in pool.translators
+    asyncio.run(scenario())
+
+
+def test_concurrent_releases_do_not_race_on_eviction():
+    async def scenario():
+        pool = TranslatorPool(maxsize=1)
+        acquired = [await pool.acquire(f"sk-{i}") for i in range(5)]
+        results = await asyncio.gather(*(pool.release(key_hash) for key_hash, _ in acquired[:2]), return_exceptions=True)
+        assert results == [None, None]
+        assert all(t.closed for _, t in acquired[:2])
+    asyncio.run(scenario())
@@ -0,0 +1,24 @@
+import pytest
+
+pytest.importorskip("openai")
+pytest.importorskip("docx")
+pytest.importorskip("httpx")
+
+from translator import EnhancedTranslator
+
+
+@pytest.fixture
+def translator():
+    t = EnhancedTranslator.__new__(EnhancedTranslator)
+    t._user_term_regex_cache = {}
+    return t
+
+
+def test_shadowed_whole_word_hit_blocks_in_word_fallback(translator):
+    spans = translator._find_user_term_spans("New York and Yorkshire", ["New York", "York"])
+    assert spans == [(0, 8, "New York")]
+
+
+def test_longest_term_wins_overlap(translator):
+    spans = translator._find_user_term_spans("A B C D", ["A B", "B C D"])
+    assert spans == [(2, 7, "B C D")]
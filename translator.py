@@ -1,79 +1,185 @@
 import asyncio
+import hashlib
+import json
+import os
 import re
 import random
-from typing import List, Dict, Tuple
-from openai import AsyncOpenAI
+import threading
+import time
+from bisect import bisect_right, insort
+from collections import OrderedDict
+from typing import List, Dict, FrozenSet, Optional, Tuple
+from openai import AsyncOpenAI, RateLimitError
+import httpx
 import docx
 from docx.document import Document
+from docx.oxml.ns import qn
 from docx.text.paragraph import Paragraph
-from prompts import (
-    SYSTEM_PROMPT_BASE,
-    USER_TERMS_INSTRUCTION,
-    MASK_INSTRUCTION,
-    RETRY_PROMPT_ADDITION,
-    QUALITY_ASSESSMENT_PROMPT
-)
+from prompts import build_system_prompt, build_quality_prompt
+
+BATCH_SEPARATOR = "%%"
+_BATCH_SPLIT_RE = re.compile(r"^[ \t]*%%[ \t]*$", re.MULTILINE)
+# List markers such as "1. ", "(2) ", "a. " or "(b) " are kept out of the translation.
+# The whole marker is optional, so match() always succeeds and end() is 0 when there is none.
+_PREFIX_RE = re.compile(r'^(?:\s*(?:\d+\.\s*|\(\d+\)\s*|[a-zA-Z]\.\s*|\([a-zA-Z]\)\s*))?')
+# Placeholders written by _mask_text; the closing ">>" keeps <<UT1>> from matching inside <<UT10>>
+_MASK_TOKEN_RE = re.compile(r"<<(?:UT|NE)\d+>>")
+_ALPHA_RE = re.compile(r'[^\W\d_]')
+_NER_LABELS = frozenset({
+    "PERSON", "ORG", "GPE", "LOC", "FAC", "NORP", "PRODUCT", "EVENT", "WORK_OF_ART", "LAW", "LANGUAGE"
+})
+
+# spaCy model and the per-text NER/mask results are the same for every API key, so all pooled
+# translators share one lazily loaded pipeline and one bounded copy of each cache
+_SPACY_LOCK = threading.Lock()
+_SPACY_STATE: Dict[str, object] = {}
+_ENTITY_SPANS: OrderedDict = OrderedDict()
+_MASK_CACHE: OrderedDict = OrderedDict()
+
+def _shared_spacy_nlp():
+    # Loads at most once per process even when several translators race from worker threads
+    with _SPACY_LOCK:
+        if "nlp" not in _SPACY_STATE:
+            try:
+                import spacy
+                _SPACY_STATE["nlp"] = spacy.load("en_core_web_sm", exclude=["tagger", "parser", "lemmatizer", "attribute_ruler", "senter"])
+            except Exception:
+                _SPACY_STATE["nlp"] = None
+        return _SPACY_STATE["nlp"]
+
+class TokenBucket:
+    """Async token bucket; the refill rate is halved on 429s and recovers additively on success (AIMD)."""
+    def __init__(self, rpm_limit: int):
+        self.max_rate = rpm_limit / 60.0
+        self.min_rate = self.max_rate / 64
+        self.rate = self.max_rate
+        self.capacity = max(1, rpm_limit // 6)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, n: int = 1):
+        # Waiters queue on the lock, so tokens are handed out in arrival order
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= n:
+                    self.tokens -= n
+                    return
+                await asyncio.sleep((n - self.tokens) / self.rate)
+
+    def on_rate_limited(self):
+        self._refill()
+        self.rate = max(self.min_rate, self.rate / 2)
+
+    def on_success(self):
+        self._refill()
+        self.rate = min(self.max_rate, self.rate + self.max_rate / 50)
 
 class EnhancedTranslator:
     def __init__(self, api_key: str):
         self.api_key = api_key
-        self.client = AsyncOpenAI(api_key=api_key)
         self.quality_threshold = 30
+        # Share of heuristically clean translations still sent to the judge model
+        self.quality_sample_rate = 0.1
         self.max_retries = 3
         self.concurrency_limit = 10
+        # HTTP/2 multiplexes the concurrent requests over a few pooled connections instead of a handshake per burst
+        http_client = httpx.AsyncClient(
+            http2=True,
+            limits=httpx.Limits(max_connections=self.concurrency_limit * 2, max_keepalive_connections=self.concurrency_limit * 2),
+            timeout=httpx.Timeout(60.0, read=300.0),
+        )
+        # No SDK-level retries: translate_text_with_quality retries itself, and the rate limiter must see every 429
+        self.client = AsyncOpenAI(api_key=api_key, http_client=http_client, max_retries=0)
         self.rpm_limit = 950
+        self.rate_limiter = TokenBucket(self.rpm_limit)
+        self.batch_max_chars = 3500
+        self.batch_max_items = 20
+        # Large documents can go through the OpenAI Batch API (cheaper, but completes asynchronously)
+        self.use_batch_api = os.environ.get("OPENAI_USE_BATCH_API", "").lower() in ("1", "true", "yes")
+        self.batch_api_threshold = 200
+        self.batch_api_poll_interval = 30.0
+        # Translations reused across documents handled by this translator: (text, lang, terms) -> (translation, score).
+        # Kept small because the app pools one translator per API key.
+        self._translation_cache: OrderedDict = OrderedDict()
+        self.translation_cache_size = 1000
         self._spacy_nlp = None
         self._spacy_available = None
+        self.spacy_batch_size = int(os.environ.get("SPACY_BATCH_SIZE", "64"))
+        # NER results per paragraph text (filled in bulk by precompute_entity_spans) and masking results;
+        # both are process-wide and shared by every translator
+        self._entity_spans = _ENTITY_SPANS
+        self.entity_cache_size = 5000
+        self._mask_cache = _MASK_CACHE
+        self.mask_cache_size = 5000
+        self._user_term_regex_cache: Dict[Tuple[str, ...], Tuple[Tuple[str, "re.Pattern", "re.Pattern"], ...]] = {}
 
-    def ensure_spacy(self) -> bool:
-        if self._spacy_available is not None:
-            return self._spacy_available
+    async def aclose(self):
+        await self.client.close()
+
+    async def _create_completion(self, **kwargs):
+        await self.rate_limiter.acquire()
         try:
-            import spacy
-            try:
-                self._spacy_nlp = spacy.load("en_core_web_sm")
-                self._spacy_available = True
-            except Exception:
-                self._spacy_nlp = None
-                self._spacy_available = False
-        except Exception:
-            self._spacy_nlp = None
-            self._spacy_available = False
+            response = await self.client.chat.completions.create(**kwargs)
+        except RateLimitError:
+            self.rate_limiter.on_rate_limited()
+            raise
+        self.rate_limiter.on_success()
+        return response
+
+    def ensure_spacy(self) -> bool:
+        if self._spacy_available is None:
+            self._spacy_nlp = _shared_spacy_nlp()
+            self._spacy_available = self._spacy_nlp is not None
         return self._spacy_available
 
-    def _find_user_term_spans(self, text: str, user_terms: List[str]) -> List[Tuple[int, int, str]]:
+    def _user_term_patterns(self, terms: Tuple[str, ...]) -> Tuple[Tuple[str, "re.Pattern", "re.Pattern"], ...]:
+        patterns = self._user_term_regex_cache.get(terms)
+        if patterns is None:
+            patterns = tuple(
+                (term.lower(), re.compile(rf"(?i)(?<!\w){re.escape(term)}(?!\w)"), re.compile(rf"(?i){re.escape(term)}"))
+                for term in terms
+            )
+            if len(self._user_term_regex_cache) >= 256:
+                self._user_term_regex_cache.clear()
+            self._user_term_regex_cache[terms] = patterns
+        return patterns
+
+    def _find_user_term_spans(self, text: str, user_terms: List[str], lowered: Optional[str] = None) -> List[Tuple[int, int, str]]:
         if not user_terms or not text:
             return []
-        spans = []
-        occupied = [False] * len(text)
-        sorted_terms = sorted({t for t in user_terms if t}, key=lambda x: len(x), reverse=True)
-        for term in sorted_terms:
-            escaped = re.escape(term)
-            pattern = re.compile(rf"(?i)(?<!\w){escaped}(?!\w)")
-            matches = list(pattern.finditer(text))
-            if not matches:
-                fallback = re.compile(rf"(?i){escaped}")
-                matches = list(fallback.finditer(text))
+        # Longest-first so a longer term claims its text before any shorter term it overlaps
+        terms = tuple(sorted({t for t in user_terms if t}, key=len, reverse=True))
+        if lowered is None:
+            lowered = text.lower()
+        spans: List[Tuple[int, int, str]] = []
+        # Cheap substring pre-filter: most paragraphs contain none of the terms
+        for term_lower, boundary_re, fallback_re in self._user_term_patterns(terms):
+            if term_lower not in lowered:
+                continue
+            # The in-word fallback only applies to terms with no whole-word occurrence at all
+            matches = list(boundary_re.finditer(text)) or list(fallback_re.finditer(text))
             for m in matches:
                 s, e = m.start(), m.end()
-                if any(occupied[i] for i in range(s, e)):
+                # spans stays sorted and non-overlapping, so only the neighbours around s can collide
+                idx = bisect_right(spans, (s,)) - 1
+                if idx >= 0 and spans[idx][1] > s:
                     continue
-                spans.append((s, e, text[s:e]))
-                for i in range(s, e):
-                    occupied[i] = True
-        spans.sort(key=lambda x: x[0])
+                if idx + 1 < len(spans) and spans[idx + 1][0] < e:
+                    continue
+                insort(spans, (s, e, m.group(0)))
         return spans
 
-    def _find_spacy_entity_spans(self, text: str) -> List[Tuple[int, int, str]]:
-        if not text or not self.ensure_spacy() or not self._spacy_nlp:
-            return []
-        doc = self._spacy_nlp(text)
+    def _entity_spans_from_doc(self, doc, text: str) -> List[Tuple[int, int, str]]:
         spans = []
-        allowed_labels = {
-            "PERSON", "ORG", "GPE", "LOC", "FAC", "NORP", "PRODUCT", "EVENT", "WORK_OF_ART", "LAW", "LANGUAGE"
-        }
         for ent in getattr(doc, "ents", []):
-            if getattr(ent, "label_", None) not in allowed_labels:
+            if getattr(ent, "label_", None) not in _NER_LABELS:
                 continue
             s, e = int(ent.start_char), int(ent.end_char)
             if 0 <= s < e <= len(text):
@@ -81,14 +187,59 @@ class EnhancedTranslator:
         spans.sort(key=lambda x: x[0])
         return spans
 
+    def _remember_entity_spans(self, text: str, spans: List[Tuple[int, int, str]]):
+        self._entity_spans[text] = spans
+        self._entity_spans.move_to_end(text)
+        while len(self._entity_spans) > self.entity_cache_size:
+            self._entity_spans.popitem(last=False)
+
+    def _pipe_entity_spans(self, texts: List[str]) -> List[List[Tuple[int, int, str]]]:
+        return [self._entity_spans_from_doc(doc, text) for text, doc in zip(texts, self._spacy_nlp.pipe(texts, batch_size=self.spacy_batch_size))]
+
+    async def precompute_entity_spans(self, texts: List[str]):
+        # Model loading and NER are CPU-bound; keep them off the event loop. The cache is only touched here.
+        if not await asyncio.to_thread(self.ensure_spacy) or not self._spacy_nlp:
+            return
+        todo = [t for t in texts if t and t not in self._entity_spans and t.lower() != t]
+        if not todo:
+            return
+        for text, spans in zip(todo, await asyncio.to_thread(self._pipe_entity_spans, todo)):
+            self._remember_entity_spans(text, spans)
+
+    def _find_spacy_entity_spans(self, text: str) -> List[Tuple[int, int, str]]:
+        if not text or not self.ensure_spacy() or not self._spacy_nlp:
+            return []
+        spans = self._entity_spans.get(text)
+        if spans is None:
+            spans = self._entity_spans_from_doc(self._spacy_nlp(text), text)
+            self._remember_entity_spans(text, spans)
+        return spans
+
     def _mask_text(self, text: str, user_terms: List[str]) -> Tuple[str, Dict[str, str]]:
+        # Retries and the per-segment fallback after a failed batch mask the same text again
+        key = (text, tuple(user_terms))
+        masked = self._mask_cache.get(key)
+        if masked is None:
+            masked = self._mask_cache[key] = self._build_mask(text, user_terms)
+            while len(self._mask_cache) > self.mask_cache_size:
+                self._mask_cache.popitem(last=False)
+        else:
+            self._mask_cache.move_to_end(key)
+        return masked
+
+    def _build_mask(self, text: str, user_terms: List[str]) -> Tuple[str, Dict[str, str]]:
         if not text:
             return text, {}
-        user_spans = self._find_user_term_spans(text, user_terms)
-        spacy_spans = self._find_spacy_entity_spans(text)
-        filtered_spacy_spans = []
+        lowered = text.lower()
+        user_spans = self._find_user_term_spans(text, user_terms, lowered)
+        # All allowed entity labels are capitalised, so all-lowercase text can't yield one
+        spacy_spans = self._find_spacy_entity_spans(text) if lowered != text else []
+        # Both lists are sorted and user spans don't overlap, so one forward sweep finds every collision
+        filtered_spacy_spans, j = [], 0
         for s_s, s_e, s_val in spacy_spans:
-            if not any(not (s_e <= u_s or s_s >= u_e) for u_s, u_e, _ in user_spans):
+            while j < len(user_spans) and user_spans[j][1] <= s_s:
+                j += 1
+            if j == len(user_spans) or user_spans[j][0] >= s_e:
                 filtered_spacy_spans.append((s_s, s_e, s_val))
         combined = [(s, e, v, "UT") for s, e, v in user_spans] + [(s, e, v, "NE") for s, e, v in filtered_spacy_spans]
         if not combined:
@@ -110,12 +261,10 @@ class EnhancedTranslator:
     def _unmask_text(self, text: str, token_map: Dict[str, str]) -> str:
         if not token_map or not text:
             return text
-        for token, original in sorted(token_map.items(), key=lambda x: -len(x[0])):
-            text = text.replace(token, original)
-        return text
+        return _MASK_TOKEN_RE.sub(lambda m: token_map.get(m.group(0), m.group(0)), text)
 
     def is_translatable(self, text: str) -> bool:
-        return bool(text and text.strip() and any(char.isalpha() for char in text))
+        return bool(text and _ALPHA_RE.search(text))
 
     def copy_run_style(self, source_run, target_run):
         target_run.style = source_run.style
@@ -126,31 +275,43 @@ class EnhancedTranslator:
             font.color.rgb = source_font.color.rgb
 
     def get_all_paragraphs(self, doc: Document) -> List[Paragraph]:
-        all_paragraphs = list(doc.paragraphs)
-        for table in doc.tables:
-            for row in table.rows:
-                for cell in row.cells:
-                    all_paragraphs.extend(cell.paragraphs)
+        # One walk over the body XML picks up paragraphs in tables (including nested ones) and content controls
+        p_tag = qn("w:p")
+        all_paragraphs = [Paragraph(p, doc._body) for p in doc.element.body.iter(p_tag)]
+        seen = set()
         for section in doc.sections:
-            all_paragraphs.extend(section.header.paragraphs)
-            all_paragraphs.extend(section.footer.paragraphs)
+            for hf in (section.header, section.footer, section.first_page_header, section.first_page_footer,
+                       section.even_page_header, section.even_page_footer):
+                # Linked parts belong to an earlier section; touching _element would also create an empty definition
+                if hf.is_linked_to_previous:
+                    continue
+                element = hf._element
+                if element in seen:
+                    continue
+                seen.add(element)
+                all_paragraphs.extend(Paragraph(p, hf) for p in element.iter(p_tag))
         return all_paragraphs
 
+    def _looks_suspicious(self, original: str, translated: str, token_map: Dict[str, str]) -> bool:
+        if not 0.5 <= len(translated) / max(1, len(original)) <= 2:
+            return True
+        if "<<UT" in translated or "<<NE" in translated:
+            return True
+        return not all(value in translated for value in token_map.values())
+
+    def _sample_for_judge(self) -> bool:
+        # Rolled once per request (single segment or whole batch), so the judge sees ~quality_sample_rate of them
+        return random.random() < self.quality_sample_rate
+
     async def translate_text_with_quality(self, text: str, target_lang: str, user_terms: List[str]) -> tuple:
         base_delay = 1.0
+        masked_text, token_map = self._mask_text(text, user_terms or [])
         for attempt in range(self.max_retries):
             try:
-                masked_text, token_map = self._mask_text(text, user_terms or [])
-                system_prompt = SYSTEM_PROMPT_BASE.format(target_lang=target_lang)
-                if user_terms:
-                    terms_list_str = ", ".join(f'"{term}"' for term in user_terms)
-                    system_prompt += USER_TERMS_INSTRUCTION.format(terms_list_str=terms_list_str)
-                system_prompt += MASK_INSTRUCTION
-                if attempt > 0:
-                    system_prompt += RETRY_PROMPT_ADDITION.format(attempt=attempt + 1)
+                system_prompt = build_system_prompt(target_lang, tuple(user_terms or ()), attempt)
                 
                 message = [{"role": "system", "content": system_prompt}, {"role": "user", "content": masked_text}]
-                response = await self.client.chat.completions.create(
+                response = await self._create_completion(
                     model="gpt-4o-mini", messages=message,
                     temperature=0.1 if attempt > 0 else 0, max_tokens=4000
                 )
@@ -159,6 +320,8 @@ class EnhancedTranslator:
                 if not translated_text:
                     if attempt == self.max_retries - 1: return text, 0
                     continue
+                if not self._looks_suspicious(text, translated_text, token_map) and not self._sample_for_judge():
+                    return translated_text, None
                 
                 quality_score = await self.validate_translation_quality(text, translated_text, target_lang)
                 if quality_score >= self.quality_threshold or attempt == self.max_retries - 1:
@@ -172,10 +335,85 @@ class EnhancedTranslator:
             await asyncio.sleep(base_delay * (2 ** attempt) + random.uniform(0, 1))
         return text, 0
 
+    def _remember_translation(self, key: Tuple[str, str, FrozenSet[str]], translated_text: str, quality_score: Optional[int]):
+        self._translation_cache[key] = (translated_text, quality_score)
+        self._translation_cache.move_to_end(key)
+        while len(self._translation_cache) > self.translation_cache_size:
+            self._translation_cache.popitem(last=False)
+
+    def _chunk_texts(self, texts: List[str]) -> List[List[str]]:
+        batches, batch, batch_chars = [], [], 0
+        for text in texts:
+            # Segments that contain the separator themselves can't be split back reliably
+            if BATCH_SEPARATOR in text:
+                batches.append([text])
+                continue
+            if batch and (batch_chars + len(text) > self.batch_max_chars or len(batch) >= self.batch_max_items):
+                batches.append(batch)
+                batch, batch_chars = [], 0
+            batch.append(text)
+            batch_chars += len(text)
+        if batch:
+            batches.append(batch)
+        return batches
+
+    async def _batch_translate(self, texts: List[str], target_lang: str, user_terms: List[str]) -> Optional[List[Tuple[str, Dict[str, str]]]]:
+        masked = [self._mask_text(text, user_terms) for text in texts]
+        system_prompt = build_system_prompt(target_lang, tuple(user_terms), 0, len(texts))
+        user_content = f"\n{BATCH_SEPARATOR}\n".join(masked_text for masked_text, _ in masked)
+        message = [{"role": "system", "content": system_prompt}, {"role": "user", "content": user_content}]
+        stream = await self._create_completion(
+            model="gpt-4o-mini", messages=message,
+            temperature=0, max_tokens=8000, stream=True
+        )
+        # Separator lines are counted as they complete, so a reply that splits into too many segments
+        # is cut off right away instead of generating the rest of the completion
+        pieces, line, separators = [], "", 0
+        try:
+            async for chunk in stream:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if not delta:
+                    continue
+                pieces.append(delta)
+                *finished_lines, line = (line + delta).split("\n")
+                separators += sum(1 for finished in finished_lines if _BATCH_SPLIT_RE.fullmatch(finished))
+                if separators >= len(texts):
+                    print(f"[INFO] Batch reply exceeded {len(texts)} segments, stopping stream early")
+                    return None
+        finally:
+            await stream.close()
+        parts = [part.strip() for part in _BATCH_SPLIT_RE.split("".join(pieces).strip())]
+        if len(parts) != len(texts) or not all(parts):
+            return None
+        return [(self._unmask_text(part, token_map), token_map) for part, (_, token_map) in zip(parts, masked)]
+
+    async def translate_batch_with_quality(self, texts: List[str], target_lang: str, user_terms: List[str]) -> List[Tuple[str, str, Optional[int]]]:
+        if len(texts) > 1:
+            try:
+                translations = await self._batch_translate(texts, target_lang, user_terms)
+            except Exception as e:
+                print(f"[WARNING] Batch translation of {len(texts)} segments failed: {e}")
+                translations = None
+            if translations is not None:
+                suspicious = any(self._looks_suspicious(text, translated, token_map) for text, (translated, token_map) in zip(texts, translations))
+                if not suspicious and not self._sample_for_judge():
+                    return [(text, translated, None) for text, (translated, _) in zip(texts, translations)]
+                quality_score = await self.validate_translation_quality("\n".join(texts), "\n".join(translated for translated, _ in translations), target_lang)
+                if quality_score >= self.quality_threshold:
+                    return [(text, translated, quality_score) for text, (translated, _) in zip(texts, translations)]
+                print(f"[INFO] Batch quality score {quality_score} below threshold {self.quality_threshold}, translating segments individually...")
+            else:
+                print(f"[INFO] Batch reply did not match {len(texts)} segments, translating segments individually...")
+        results = []
+        for text in texts:
+            translated_text, quality_score = await self.translate_text_with_quality(text, target_lang, user_terms)
+            results.append((text, translated_text, quality_score))
+        return results
+
     async def validate_translation_quality(self, original: str, translated: str, target_lang: str) -> int:
         try:
-            prompt = QUALITY_ASSESSMENT_PROMPT.format(target_lang=target_lang, original=original, translated=translated)
-            response = await self.client.chat.completions.create(
+            prompt = build_quality_prompt(target_lang, original, translated)
+            response = await self._create_completion(
                 model="gpt-4o", messages=[{"role": "user", "content": prompt}],
                 temperature=0, max_tokens=10
             )
@@ -185,55 +423,140 @@ class EnhancedTranslator:
         except Exception:
             return 20
 
+    async def _submit_batch_job(self, texts: List[str], target_lang: str, user_terms: List[str]) -> Tuple[str, Dict[str, Tuple[str, Dict[str, str]]]]:
+        system_prompt = build_system_prompt(target_lang, tuple(user_terms), 0)
+        masked_by_id, lines = {}, []
+        for text in texts:
+            custom_id = hashlib.sha1(text.encode("utf-8")).hexdigest()
+            masked_text, token_map = self._mask_text(text, user_terms)
+            masked_by_id[custom_id] = (text, token_map)
+            lines.append(json.dumps({
+                "custom_id": custom_id, "method": "POST", "url": "/v1/chat/completions",
+                "body": {"model": "gpt-4o-mini", "temperature": 0, "max_tokens": 4000,
+                         "messages": [{"role": "system", "content": system_prompt}, {"role": "user", "content": masked_text}]},
+            }, ensure_ascii=False))
+        input_file = await self.client.files.create(file=("batch.jsonl", "\n".join(lines).encode("utf-8")), purpose="batch")
+        batch = await self.client.batches.create(input_file_id=input_file.id, endpoint="/v1/chat/completions", completion_window="24h")
+        return batch.id, masked_by_id
+
+    async def _collect_batch_results(self, output_file_id: str, masked_by_id: Dict[str, Tuple[str, Dict[str, str]]]) -> Dict[str, str]:
+        content = await self.client.files.content(output_file_id)
+        translations = {}
+        for line in content.text.splitlines():
+            if not line.strip():
+                continue
+            try:
+                item = json.loads(line)
+                response = item.get("response") or {}
+                if response.get("status_code") != 200 or item.get("custom_id") not in masked_by_id:
+                    continue
+                text, token_map = masked_by_id[item["custom_id"]]
+                translated = self._unmask_text(response["body"]["choices"][0]["message"]["content"].strip(), token_map)
+                if translated:
+                    translations[text] = translated
+            except Exception:
+                continue
+        return translations
+
     async def process_enhanced_translation(self, source_path: str, output_path: str, target_language: str, user_terms: List[str] = None):
         doc = docx.Document(source_path)
         all_paragraphs = self.get_all_paragraphs(doc)
-        prefix_pattern = re.compile(r'^\s*(?:\d+\.\s*|\(\d+\)\s*|[a-zA-Z]\.\s*|\([a-zA-Z]\)\s*)')
         
-        texts_for_translation = {}
+        # Split each paragraph once; the apply pass below reuses these records
+        paragraph_records: List[Tuple[Paragraph, str, str]] = []
         for p in all_paragraphs:
-            core_text = p.text
-            match = prefix_pattern.match(core_text)
-            prefix = match.group(0) if match else ""
-            if match: core_text = core_text[len(prefix):]
+            text = p.text
+            split_at = _PREFIX_RE.match(text).end()
+            core_text = text[split_at:]
             if self.is_translatable(core_text):
-                texts_for_translation[core_text] = {"original_text": p.text, "prefix": prefix, "paragraph": p}
+                paragraph_records.append((p, text[:split_at], core_text))
         
-        unique_texts_to_translate = list(texts_for_translation.keys())
+        unique_texts_to_translate = list(dict.fromkeys(core_text for _, _, core_text in paragraph_records))
         print(f"[INFO] Enhanced translation: Found {len(unique_texts_to_translate)} unique text segments")
         
         translated_cache, quality_scores = {}, []
-        semaphore = asyncio.Semaphore(self.concurrency_limit)
-        request_delay = 60.0 / self.rpm_limit
-        
-        async def translate_task(text):
-            async with semaphore:
-                translated_text, quality_score = await self.translate_text_with_quality(text, target_language, user_terms or [])
-                await asyncio.sleep(request_delay)
-                return text, translated_text, quality_score
+        results: asyncio.Queue = asyncio.Queue()
+
+        async def worker(pending_batches):
+            # Workers share one iterator, so at most concurrency_limit requests are in flight
+            for batch in pending_batches:
+                try:
+                    results.put_nowait(await self.translate_batch_with_quality(batch, target_language, user_terms or []))
+                except Exception as e:
+                    print(f"[WARNING] Batch of {len(batch)} segments failed: {e}")
+                    results.put_nowait([(text, text, 0) for text in batch])
 
         if unique_texts_to_translate:
             total_texts = len(unique_texts_to_translate)
-            print(f"[INFO] Starting enhanced translation to {target_language} with quality control...")
-            tasks = [translate_task(text) for text in unique_texts_to_translate]
-            for i, task in enumerate(asyncio.as_completed(tasks)):
-                original_text, translated_text, quality_score = await task
-                translated_cache[original_text] = translated_text
-                quality_scores.append(quality_score)
-                progress = (i + 1) / total_texts * 100
-                avg_quality = sum(quality_scores) / len(quality_scores) if quality_scores else 0
-                yield progress, avg_quality
+            terms_key = frozenset(user_terms or ())
+            pending = []
+            for text in unique_texts_to_translate:
+                cached = self._translation_cache.get((text, target_language, terms_key))
+                if cached is None:
+                    pending.append(text)
+                    continue
+                translated_cache[text] = cached[0]
+                if cached[1] is not None:
+                    quality_scores.append(cached[1])
+            if translated_cache:
+                print(f"[INFO] Reusing {len(translated_cache)} cached translations")
+                yield len(translated_cache) / total_texts * 100, sum(quality_scores) / len(quality_scores) if quality_scores else 0
+            await self.precompute_entity_spans(pending)
+            if self.use_batch_api and len(pending) >= self.batch_api_threshold:
+                batch_id, finished = None, False
+                try:
+                    print(f"[INFO] Submitting {len(pending)} segments to the OpenAI Batch API...")
+                    batch_id, masked_by_id = await self._submit_batch_job(pending, target_language, user_terms or [])
+                    while True:
+                        batch = await self.client.batches.retrieve(batch_id)
+                        if batch.status in ("completed", "failed", "expired", "cancelled"):
+                            finished = True
+                            break
+                        counts = getattr(batch, "request_counts", None)
+                        done = counts.completed if counts else 0
+                        yield (len(translated_cache) + done) / total_texts * 100, sum(quality_scores) / len(quality_scores) if quality_scores else 0
+                        await asyncio.sleep(self.batch_api_poll_interval)
+                    if batch.output_file_id:
+                        # Batch results skip the quality judge, so they carry no score and stay out of the average
+                        for text, translated_text in (await self._collect_batch_results(batch.output_file_id, masked_by_id)).items():
+                            translated_cache[text] = translated_text
+                            self._remember_translation((text, target_language, terms_key), translated_text, None)
+                    print(f"[INFO] Batch {batch_id} finished with status {batch.status}")
+                except Exception as e:
+                    print(f"[WARNING] Batch API translation failed, using chat completions: {e}")
+                finally:
+                    if batch_id and not finished:
+                        try:
+                            await self.client.batches.cancel(batch_id)
+                        except Exception:
+                            pass
+                pending = [text for text in pending if text not in translated_cache]
+            batches = self._chunk_texts(pending)
+            print(f"[INFO] Starting enhanced translation to {target_language} with quality control ({len(batches)} requests)...")
+            pending_batches = iter(batches)
+            workers = [asyncio.create_task(worker(pending_batches)) for _ in range(min(self.concurrency_limit, len(batches)))]
+            try:
+                for _ in range(len(batches)):
+                    for original_text, translated_text, quality_score in await results.get():
+                        translated_cache[original_text] = translated_text
+                        # Failed segments come back untranslated with score 0; don't cache those.
+                        # None means the judge was skipped, so there is nothing to average.
+                        if quality_score is not None:
+                            quality_scores.append(quality_score)
+                        if quality_score is None or quality_score > 0:
+                            self._remember_translation((original_text, target_language, terms_key), translated_text, quality_score)
+                    progress = len(translated_cache) / total_texts * 100
+                    avg_quality = sum(quality_scores) / len(quality_scores) if quality_scores else 0
+                    yield progress, avg_quality
+            finally:
+                for w in workers:
+                    w.cancel()
             
             avg_quality_final = sum(quality_scores) / len(quality_scores) if quality_scores else 0
             print(f"\n[INFO] Enhanced translation complete. Average quality: {avg_quality_final:.1f}/40")
         
         print("[INFO] Applying enhanced translations to document...")
-        for para in all_paragraphs:
-            original_text = para.text
-            match = prefix_pattern.match(original_text)
-            prefix = match.group(0) if match else ""
-            core_text = original_text[len(prefix):] if match else original_text
-            
+        for para, prefix, core_text in paragraph_records:
             if core_text in translated_cache:
                 translated_core_text = translated_cache[core_text]
                 final_text = prefix + translated_core_text
@@ -74,6 +74,7 @@ function debounce(fn, wait){
 function reasonToMessage(r){
   if(r === 'ok') return 'API key saved'
   if(r === 'invalid') return 'API key invalid'
+  if(r === 'invalid_format') return 'API key format invalid'
   if(r === 'expired') return 'API key expired'
   if(r === 'exhausted') return 'API quota exhausted'
   if(r === 'unreachable') return 'OpenAI API unreachable'